@@ -0,0 +1,166 @@
+import argparse
+import json
+import os
+import shutil
+import socketserver
+import threading
+import time
+import traceback
+from datetime import datetime
+
+# Scraper modules (requests, bs4, tqdm) are imported inside the job runners so that
+# `--help`, to_db jobs and the daemon start without paying for imports they don't use.
+
+DEFAULT_PARAMS = {
+    "items": "item_params_generated.json",
+    "sellers": "seller_params.json",
+}
+
+def load_params_file(path, job):
+    if not path:
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "params", DEFAULT_PARAMS[job])
+    with open(path, "r") as f:
+        return json.load(f)
+
+def run_items(params):
+    from item_scrape import scrape_poshmark
+    scrape_poshmark(params, params.get("output_file") or "poshmark_listings.csv")
+
+def run_sellers(params):
+    from seller_scrape import scrape_seller_profiles
+    scrape_seller_profiles(params)
+
+def run_to_db(params):
+    from to_db import create_database_from_folder, find_latest_profiles_csv
+    profiles_csv = params.get("profiles") or find_latest_profiles_csv()
+    create_database_from_folder(
+        params.get("folder", "seller_items"),
+        profiles_csv=profiles_csv,
+        db_path=params.get("output", "poshmark_listings.db"),
+        include_media=params.get("include_media", False),
+        snapshot_store=params.get("snapshot_store"),
+    )
+
+def run_snapshot(params):
+    from snapshots import latest_item_files, record_files
+    paths = params.get("files") or latest_item_files(params.get("folder", "seller_items"))
+    record_files(params.get("store", "snapshots"), paths, params.get("missing", "none"))
+
+JOBS = {
+    "items": run_items,
+    "sellers": run_sellers,
+    "to_db": run_to_db,
+    "snapshot": run_snapshot,
+}
+
+# Jobs share the process-wide METRICS registry, so the daemon runs them one at a time
+job_lock = threading.Lock()
+
+def run_job(job):
+    # A job is {"job": "items" | "sellers" | "to_db" | "snapshot", "params": {...}}; a bare params dict runs as items
+    from metrics import metrics_run
+    kind = job.get("job", "items")
+    params = job.get("params", job)
+    if kind not in JOBS:
+        raise ValueError(f"Unknown job type: {kind}")
+    with job_lock:
+        with metrics_run(params.get("metrics_file"), params.get("metrics_interval", 30), params.get("profile_file")):
+            JOBS[kind](params)
+
+def serve_spool(spool_dir, poll_interval=2.0):
+    # incoming/*.json -> processing/ -> done/ or failed/ (with a .log of the traceback)
+    dirs = {name: os.path.join(spool_dir, name) for name in ("incoming", "processing", "done", "failed")}
+    for path in dirs.values():
+        os.makedirs(path, exist_ok=True)
+    print(f"Watching {dirs['incoming']} for jobs")
+    while True:
+        names = sorted(f for f in os.listdir(dirs["incoming"]) if f.endswith(".json"))
+        if not names:
+            time.sleep(poll_interval)
+            continue
+        for name in names:
+            claimed = os.path.join(dirs["processing"], name)
+            try:
+                # rename is atomic, so several workers can share one spool
+                os.rename(os.path.join(dirs["incoming"], name), claimed)
+            except FileNotFoundError:
+                continue
+            print(f"▶️  {datetime.now():%Y-%m-%d %H:%M:%S} running {name}")
+            try:
+                with open(claimed, "r") as f:
+                    run_job(json.load(f))
+                shutil.move(claimed, os.path.join(dirs["done"], name))
+                print(f"✅ Finished {name}")
+            except Exception as e:
+                shutil.move(claimed, os.path.join(dirs["failed"], name))
+                with open(os.path.join(dirs["failed"], f"{name}.log"), "w") as f:
+                    f.write(traceback.format_exc())
+                print(f"❌ Job {name} failed: {e}")
+
+class JobHandler(socketserver.StreamRequestHandler):
+    # One JSON job per line; replies with one JSON status line when the job is done
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                run_job(json.loads(line))
+                reply = {"status": "ok"}
+            except Exception as e:
+                reply = {"status": "error", "error": str(e)}
+            self.wfile.write((json.dumps(reply) + "\n").encode("utf-8"))
+
+def serve_socket(socket_path):
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    with socketserver.ThreadingUnixStreamServer(socket_path, JobHandler) as server:
+        # Don't let an idle client connection keep the process alive on shutdown
+        server.daemon_threads = True
+        print(f"Listening for jobs on {socket_path}")
+        try:
+            server.serve_forever()
+        finally:
+            os.remove(socket_path)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Poshmark scraper entry point.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for job in ("items", "sellers"):
+        sub = subparsers.add_parser(job, help=f"Run the {job} scraper")
+        sub.add_argument("--params", type=str, default="", help=f"Params JSON (default params/{DEFAULT_PARAMS[job]})")
+
+    # Everything after `to_db` is handed to to_db.py's own parser
+    subparsers.add_parser("to_db", help="Build the SQLite database (accepts to_db.py options)", add_help=False)
+
+    daemon = subparsers.add_parser("daemon", help="Keep a worker running and take jobs from a spool directory or socket")
+    source = daemon.add_mutually_exclusive_group(required=True)
+    source.add_argument("--spool", type=str, help="Spool directory; drop job JSON files into <spool>/incoming")
+    source.add_argument("--socket", type=str, help="Unix socket path; send one job JSON per line")
+    daemon.add_argument("--poll-interval", type=float, default=2.0, help="Seconds between spool directory scans")
+    daemon.add_argument("--preload", action="store_true", help="Import all scraper modules up front")
+    daemon.add_argument("--cache-mb", type=int, default=64, help="Memory for ETag/Last-Modified revalidation across jobs (0 to disable)")
+
+    args, extra = parser.parse_known_args(argv)
+    if extra and args.command != "to_db":
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+
+    if args.command in ("items", "sellers"):
+        run_job({"job": args.command, "params": load_params_file(args.params, args.command)})
+    elif args.command == "to_db":
+        import to_db
+        to_db.main(extra)
+    elif args.command == "daemon":
+        if args.preload:
+            import item_scrape, seller_scrape, to_db
+        if args.cache_mb:
+            # Repeat jobs re-fetch the same pages, so conditional requests pay off here
+            from fetch import enable_conditional_fetch
+            enable_conditional_fetch(args.cache_mb * 1024 * 1024)
+        if args.spool:
+            serve_spool(args.spool, args.poll_interval)
+        else:
+            serve_socket(args.socket)
+
+if __name__ == "__main__":
+    main()
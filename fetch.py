@@ -0,0 +1,126 @@
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from importlib.util import find_spec
+import requests
+from metrics import METRICS
+
+# urllib3 only decodes "br" responses when one of these brotli packages is installed
+if find_spec("brotli") or find_spec("brotlicffi"):
+    ACCEPT_ENCODING = "gzip, deflate, br"
+else:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+CHUNK_SIZE = 16 * 1024
+LISTING_MARKER = b'data-et-name="listing"'
+# Everything after the listing grid is footer and large inline state scripts we never parse
+STOP_MARKERS = (b"window.__INITIAL_STATE__", b"<footer")
+
+local = threading.local()
+
+def get_session():
+    # One keep-alive session per worker thread
+    session = getattr(local, "session", None)
+    if session is None:
+        session = local.session = requests.Session()
+    return session
+
+class ValidatorCache:
+    """ETag/Last-Modified per URL plus the (zlib-compressed) body to reuse on a 304, capped by total bytes."""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+
+    def get(self, url):
+        with self.lock:
+            entry = self.entries.get(url)
+            if entry:
+                self.entries.move_to_end(url)
+            return entry
+
+    def put(self, url, etag, last_modified, body):
+        if not etag and not last_modified:
+            return
+        compressed = zlib.compress(body)
+        if len(compressed) > self.max_bytes:
+            return
+        with self.lock:
+            previous = self.entries.pop(url, None)
+            if previous:
+                self.total_bytes -= len(previous[2])
+            self.entries[url] = (etag, last_modified, compressed)
+            self.total_bytes += len(compressed)
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.total_bytes -= len(evicted[2])
+
+# Off by default: a one-shot run fetches each URL once, so caching bodies only costs CPU and
+# memory. Long-lived processes (cli.py daemon) or conditional_fetch params turn it on.
+VALIDATORS = None
+
+def enable_conditional_fetch(max_bytes=64 * 1024 * 1024):
+    global VALIDATORS
+    if VALIDATORS is None:
+        VALIDATORS = ValidatorCache(max_bytes)
+    return VALIDATORS
+
+def read_until_listings_end(response, stop_markers):
+    # Reads decoded chunks and stops at the first stop marker that follows a listing tile.
+    # Returns (body, truncated); pages without listings are read in full.
+    chunks = []
+    tail = b""
+    seen_listing = False
+    keep = max([len(LISTING_MARKER)] + [len(m) for m in stop_markers])
+    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+        chunks.append(chunk)
+        window = tail + chunk
+        if LISTING_MARKER in window:
+            # Only look for stop markers after the last tile seen so far
+            seen_listing = True
+            window = window[window.rfind(LISTING_MARKER):]
+        if seen_listing:
+            found = [i for i in (window.find(marker) for marker in stop_markers) if i != -1]
+            if found:
+                # Trim everything from the earliest marker onwards
+                extra = len(window) - min(found)
+                body = b"".join(chunks)
+                return body[:len(body) - extra], True
+        tail = window[-keep:]
+    return b"".join(chunks), False
+
+def fetch_page(url, headers=None, timeout=15, stop_markers=STOP_MARKERS):
+    request_headers = {"Accept-Encoding": ACCEPT_ENCODING, **(headers or {})}
+    validators = VALIDATORS
+    cached = validators.get(url) if validators else None
+    if cached:
+        etag, last_modified, _ = cached
+        if etag:
+            request_headers["If-None-Match"] = etag
+        if last_modified:
+            request_headers["If-Modified-Since"] = last_modified
+
+    start = time.perf_counter()
+    response = get_session().get(url, headers=request_headers, timeout=timeout, stream=True)
+    body = b""
+    truncated = False
+    try:
+        if response.status_code == 304 and cached:
+            body = zlib.decompress(cached[2])
+            METRICS.inc("http_not_modified")
+        else:
+            response.raise_for_status()
+            body, truncated = read_until_listings_end(response, stop_markers or ())
+            if validators:
+                validators.put(url, response.headers.get("ETag"), response.headers.get("Last-Modified"), body)
+    finally:
+        # Bytes pulled off the socket (still compressed) vs bytes we actually decoded
+        wire_bytes = response.raw.tell()
+        response.close()
+        METRICS.record_response(response.status_code, wire_bytes, len(body), time.perf_counter() - start)
+    if truncated:
+        METRICS.inc("http_truncated")
+    return body.decode(response.encoding or "utf-8", errors="replace")
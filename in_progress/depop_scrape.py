@@ -4,9 +4,13 @@ import os
 import time
 import random
 import json
+import sys
 from datetime import datetime
 from tqdm import tqdm
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from listing import Listing, ListingBatch
+
 
 def get_unique_filename(base_name):
     name, ext = os.path.splitext(base_name)
@@ -32,20 +36,6 @@ def build_initial_url(params):
     }
 
 
-def extract_listing_data(product):
-    return {
-        "ID": product.get("id"),
-        "Title": product.get("title"),
-        "Price": product.get("price", {}).get("amount"),
-        "Currency": product.get("price", {}).get("currency"),
-        "Brand": product.get("brand", {}).get("name"),
-        "Size": product.get("size"),
-        "Seller": product.get("seller", {}).get("username"),
-        "URL": f"https://www.depop.com/products/{product.get('id')}" if product.get("id") else "",
-        "Image": product.get("picture", {}).get("url")
-    }
-
-
 def scrape_depop(params):
     headers = {"User-Agent": "Mozilla/5.0"}
     base_url, query = build_initial_url(params)
@@ -54,14 +44,13 @@ def scrape_depop(params):
     delay_range = params.get("delay_range", [0.2, 1.0])
     output_file = get_unique_filename(params.get("output_file", "depop_listings.csv"))
 
-    all_rows = []
+    total_rows = 0
     page = 1
 
+    fieldnames = ["ID", "Title", "Price", "Currency", "Size", "Brand", "Seller", "URL", "Image"]
     with open(output_file, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=[
-            "ID", "Title", "Price", "Currency", "Size", "Brand", "Seller", "URL", "Image"
-        ])
-        writer.writeheader()
+        writer = csv.writer(f)
+        writer.writerow(fieldnames)
 
         while page <= max_pages:
             if cursor:
@@ -79,9 +68,9 @@ def scrape_depop(params):
                     print("❌ No products found, stopping.")
                     break
 
-                rows = [extract_listing_data(p) for p in products]
-                writer.writerows(rows)
-                all_rows.extend(rows)
+                batch = ListingBatch(Listing.from_depop(p) for p in products)
+                batch.write_csv(writer, fieldnames)
+                total_rows += len(batch)
 
                 cursor = data.get("cursor")
                 if not cursor:
@@ -94,7 +83,7 @@ def scrape_depop(params):
                 print(f"❌ Error on page {page}: {e}")
                 break
 
-    print(f"\n✅ Saved {len(all_rows)} listings to {output_file}")
+    print(f"\n✅ Saved {total_rows} listings to {output_file}")
 
 
 if __name__ == "__main__":
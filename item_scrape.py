@@ -1,4 +1,3 @@
-import requests
 from bs4 import BeautifulSoup
 import json
 import csv
@@ -7,6 +6,10 @@ import os
 from tqdm import tqdm
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from metrics import METRICS, metrics_run
+from fetch import STOP_MARKERS, enable_conditional_fetch, fetch_page
+from listing import Listing, ListingBatch, ParquetSink
+from query_plan import PAGE_SIZE, query_key, record_count, save_counts
 
 def get_unique_filename(base_name):
     name, ext = os.path.splitext(base_name)
@@ -40,61 +43,52 @@ def build_url(params):
     query_str = urllib.parse.urlencode(query, doseq=True)
     return f"{base}{full_path}?{query_str}"
 
-def extract_listing_data(listing):
-    def safe_text(tag):
-        return tag.get_text(strip=True).replace("\n", " ") if tag else "N/A"
-
-    title_tag = listing.find("a", class_="tile__title")
-    price_tag = listing.find("span", class_="p--t--1 fw--bold")
-    link_tag = listing.find("a", class_="tile__covershot")
-    size_tag = listing.find("a", class_="tile__details__pipe__size")
-    seller_tag = listing.find("a", class_="tile__creator")
-    brand_tag = listing.find("a", class_="tile__details__pipe__brand")
-    img_tag = listing.find("img")
-    like_tag = listing.find("div", class_="social-action-bar__like")
-    like_span = like_tag.find("span") if like_tag else None
-
-    image_url = img_tag.get("src") or img_tag.get("data-src") if img_tag else "N/A"
-    category_id = listing.get("data-et-prop-category_id", "N/A")
-
-    return {
-        "Title": safe_text(title_tag),
-        "Price": safe_text(price_tag),
-        "Size": safe_text(size_tag).replace("Size: ", ""),
-        "Brand": safe_text(brand_tag),
-        "Seller": safe_text(seller_tag),
-        "URL": f"https://poshmark.com{link_tag['href']}" if link_tag else "N/A",
-        "Image": image_url,
-        "Likes": like_span.text.strip() if like_span and like_span.text.strip().isdigit() else "0",
-        "CategoryID": category_id
-    }
-
-def scrape_page(params, page):
+def scrape_page(params, page, stop_markers=STOP_MARKERS):
     headers = {"User-Agent": "Mozilla/5.0"}
     page_params = params.copy()
     page_params["page"] = page
     url = build_url(page_params)
     # print(f"Scraping page {page}: {url}")
-    response = requests.get(url, headers=headers)
-    soup = BeautifulSoup(response.text, "html.parser")
-    listings = soup.find_all("div", {"data-et-name": "listing"})
-    rows = [extract_listing_data(listing) for listing in listings]
-    return rows
+    html = fetch_page(url, headers=headers, stop_markers=stop_markers)
+    with METRICS.timer("parse_seconds"):
+        soup = BeautifulSoup(html, "html.parser")
+        listings = soup.find_all("div", {"data-et-name": "listing"})
+        batch = ListingBatch(Listing.from_tile(listing) for listing in listings)
+        soup.decompose()
+    METRICS.observe("rows_per_page", len(batch))
+    return batch
 
 def scrape_poshmark(params, output_file="poshmark_listings.csv"):
-    all_rows = []
     max_pages = params.get("max_pages")
     max_workers = params.get("max_workers", 5)
+    dedup = params.get("dedup", 0)
+    parquet_file = params.get("parquet_file")
+    # partial_fetch stops reading each page once the listing grid has been received
+    stop_markers = STOP_MARKERS if params.get("partial_fetch", 1) else ()
+    if params.get("conditional_fetch"):
+        enable_conditional_fetch(params.get("conditional_cache_mb", 64) * 1024 * 1024)
+    counts_file = params.get("counts_file")
 
     categories = params.get("categories", [])
+    planned_queries = params.get("queries", [])
     price_range = params.get("price_range", [0, 100])
     price_step = params.get("price_step", None)
 
-    if not categories:
+    if not categories and not planned_queries:
         print("No categories provided.")
         return
 
     queries = []
+    # Planned queries (see params/build_item_params.py) carry their own price range and page budget
+    for planned in planned_queries:
+        for page in range(1, planned.get("max_pages", max_pages) + 1):
+            queries.append({
+                **planned,
+                "sort_by": params.get("sort_by", "just_in"),
+                "page": page
+            })
+    if planned_queries:
+        categories = []
     for category in categories:
         cat_name = category.get("name")
         cat_colors = category.get("colors", [])
@@ -129,22 +123,64 @@ def scrape_poshmark(params, output_file="poshmark_listings.csv"):
 
     output_file = get_unique_filename(output_file)
     keys = ["Title", "Price", "Size", "Brand", "Seller", "URL", "Image", "Likes", "CategoryID"]
+    seen_urls = set()
+    results = {}
+    failed_keys = set()
+    parquet = ParquetSink(get_unique_filename(parquet_file), keys + ["PriceCents"]) if parquet_file else None
     with open(output_file, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=keys, quoting=csv.QUOTE_ALL)
-        writer.writeheader()
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+        writer.writerow(keys)
 
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = {executor.submit(scrape_page, q, q["page"]): q for q in queries}
+            futures = {executor.submit(scrape_page, q, q["page"], stop_markers): q for q in queries}
+            pending = len(futures)
+            METRICS.set_gauge("queue_depth", pending)
             for future in tqdm(as_completed(futures), total=len(futures), desc="Scraping Pages", unit="page"):
+                pending -= 1
+                METRICS.set_gauge("queue_depth", pending)
                 try:
-                    rows = future.result()
-                    # if not rows:
+                    q = futures[future]
+                    key = query_key(q["category"], q["sizes"], q["price_range"]) if q.get("price_range") else None
+                    try:
+                        batch = future.result()
+                    except Exception:
+                        failed_keys.add(key)
+                        raise
+                    if key:
+                        result = results.setdefault(key, [q, 0, False])
+                        result[1] += len(batch)
+                        # A full last page means the query has more results than its page budget
+                        if q["page"] == q.get("max_pages", max_pages) and len(batch) >= PAGE_SIZE:
+                            result[2] = True
+                    # if not batch:
                     #     print(f"No listings found on page {futures[future]['page']} of {futures[future]['category']}")
-                    writer.writerows(rows)
+                    if dedup:
+                        total = len(batch)
+                        batch = batch.dedup(seen_urls)
+                        METRICS.inc("duplicate_rows", total - len(batch))
+                    with METRICS.timer("write_seconds"):
+                        batch.write_csv(writer, keys)
+                        if parquet:
+                            parquet.write(batch)
+                    METRICS.inc("pages_scraped")
+                    METRICS.inc("rows_written", len(batch))
                 except Exception as e:
+                    METRICS.inc("page_errors")
                     print(f"Error scraping {futures[future]['category']} page {futures[future]['page']}: {e}")
+    if parquet:
+        parquet.close()
+
+    if counts_file:
+        counts = {}
+        for key, (q, rows, saturated) in results.items():
+            if key not in failed_keys:
+                record_count(counts, q["category"], q["sizes"], q["price_range"], rows, saturated)
+        if not os.path.isabs(counts_file):
+            counts_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "params", counts_file)
+        save_counts(counts_file, counts)
+        print(f"Saved result counts for {len(counts)} queries to {counts_file}")
 
-    print(f"\nSaved {len(all_rows)} total listings to {output_file}")
+    print(f"\nSaved {METRICS.counters.get('rows_written', 0)} total listings to {output_file}")
 
 def load_params(folder="params", filename="item_params.json"):
     # Get the directory of the current script
@@ -157,4 +193,5 @@ if __name__ == "__main__":
     PARAMS_FOLDER = "params"
     PARAMS_FILE = "item_params_generated.json"
     params = load_params(PARAMS_FOLDER, PARAMS_FILE)
-    scrape_poshmark(params)
+    with metrics_run(params.get("metrics_file"), params.get("metrics_interval", 30), params.get("profile_file")):
+        scrape_poshmark(params)
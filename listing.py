@@ -0,0 +1,250 @@
+import re
+import sys
+from array import array
+
+MISSING = "N/A"
+NO_PRICE = -1
+
+# CSV/SQL column name -> Listing attribute
+COLUMNS = {
+    "ID": "listing_id",
+    "Title": "title",
+    "Price": "price_cents",
+    "Currency": "currency",
+    "Size": "size",
+    "Brand": "brand",
+    "Seller": "seller",
+    "URL": "url",
+    "ItemURL": "url",
+    "Image": "image",
+    "Likes": "likes",
+    "CategoryID": "category_id",
+    "CategoryName": "category_name",
+}
+
+TEXT_FIELDS = ("listing_id", "title", "currency", "size", "brand", "seller", "url", "image", "category_id", "category_name")
+# Low-cardinality fields that repeat across thousands of rows
+INTERNED_FIELDS = ("currency", "size", "brand", "seller", "category_id", "category_name")
+
+def parse_price_cents(text):
+    if text is None:
+        return None
+    match = re.search(r"\d[\d,]*(?:\.\d+)?", str(text))
+    if not match:
+        return None
+    return round(float(match.group(0).replace(",", "")) * 100)
+
+def format_price(cents, currency=None):
+    if cents is None or cents < 0:
+        return None
+    if currency:
+        return f"{cents / 100:.2f}"
+    if cents % 100 == 0:
+        return f"${cents // 100:,}"
+    return f"${cents / 100:,.2f}"
+
+def parse_likes(text):
+    text = str(text).strip() if text is not None else ""
+    return int(text) if text.isdigit() else 0
+
+def clean(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    return None if not value or value == MISSING else value
+
+class Listing:
+    __slots__ = ("listing_id", "title", "price_cents", "currency", "size", "brand", "seller", "url", "image", "likes", "category_id", "category_name")
+
+    def __init__(self, title=None, price_cents=None, size=None, brand=None, seller=None, url=None, image=None,
+                 likes=0, category_id=None, category_name=None, listing_id=None, currency=None):
+        self.listing_id = listing_id
+        self.title = title
+        self.price_cents = price_cents
+        self.currency = currency
+        self.size = size
+        self.brand = brand
+        self.seller = seller
+        self.url = url
+        self.image = image
+        self.likes = likes
+        self.category_id = category_id
+        self.category_name = category_name
+        for field in INTERNED_FIELDS:
+            value = getattr(self, field)
+            if value:
+                setattr(self, field, sys.intern(value))
+
+    def __repr__(self):
+        return f"Listing({self.title!r}, {format_price(self.price_cents, self.currency)}, {self.url!r})"
+
+    @classmethod
+    def from_tile(cls, tile):
+        # Poshmark listing tile (div[data-et-name=listing]) from a category or closet page
+        def safe_text(tag):
+            return clean(tag.get_text().replace("\n", " ")) if tag else None
+
+        title_tag = tile.find("a", class_="tile__title")
+        price_tag = tile.find("span", class_="p--t--1 fw--bold")
+        link_tag = tile.find("a", class_="tile__covershot")
+        size_tag = tile.find("a", class_="tile__details__pipe__size")
+        brand_tag = tile.find("a", class_="tile__details__pipe__brand")
+        seller_tag = tile.find("a", class_="tile__creator")
+        img_tag = tile.find("img")
+        like_tag = tile.find("div", class_="social-action-bar__like")
+        like_span = like_tag.find("span") if like_tag else None
+
+        category_id = tile.get("data-et-prop-category_id")
+        if category_id is None:
+            category_tag = tile.find(attrs={"data-et-prop-category_id": True})
+            category_id = category_tag["data-et-prop-category_id"] if category_tag else None
+        category_name = None
+        if size_tag and size_tag.has_attr("href"):
+            match = re.search(r"/category/([^/?#]+)", size_tag["href"])
+            if match:
+                category_name = match.group(1).replace("-", " > ").replace("_", " ")
+        size = safe_text(size_tag)
+
+        return cls(
+            title=safe_text(title_tag),
+            price_cents=parse_price_cents(safe_text(price_tag)),
+            size=size.replace("Size: ", "") if size else None,
+            brand=safe_text(brand_tag),
+            seller=safe_text(seller_tag),
+            url=f"https://poshmark.com{link_tag['href']}" if link_tag else None,
+            image=(img_tag.get("src") or img_tag.get("data-src")) if img_tag else None,
+            likes=parse_likes(like_span.text) if like_span else 0,
+            category_id=clean(category_id),
+            category_name=category_name,
+        )
+
+    @classmethod
+    def from_depop(cls, product):
+        product_id = product.get("id")
+        price = product.get("price", {})
+        return cls(
+            listing_id=str(product_id) if product_id else None,
+            title=product.get("title"),
+            price_cents=parse_price_cents(price.get("amount")),
+            currency=price.get("currency"),
+            brand=product.get("brand", {}).get("name"),
+            size=product.get("size"),
+            seller=product.get("seller", {}).get("username"),
+            url=f"https://www.depop.com/products/{product_id}" if product_id else None,
+            image=product.get("picture", {}).get("url"),
+        )
+
+    @classmethod
+    def from_row(cls, row):
+        # Row dict read back from one of our CSVs
+        values = {}
+        for name, value in row.items():
+            field = COLUMNS.get(name)
+            if field == "price_cents":
+                values[field] = parse_price_cents(clean(value))
+            elif field == "likes":
+                values[field] = parse_likes(value)
+            elif field:
+                values[field] = clean(value)
+        return cls(**values)
+
+class ListingBatch:
+    """Columnar batch of listings: one list per text field, int arrays for price and likes."""
+    __slots__ = ("columns", "price_cents", "likes")
+
+    def __init__(self, listings=()):
+        self.columns = {field: [] for field in TEXT_FIELDS}
+        self.price_cents = array("q")
+        self.likes = array("q")
+        self.extend(listings)
+
+    def __len__(self):
+        return len(self.price_cents)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, i):
+        price = self.price_cents[i]
+        values = {field: column[i] for field, column in self.columns.items()}
+        return Listing(price_cents=None if price == NO_PRICE else price, likes=self.likes[i], **values)
+
+    def append(self, listing):
+        for field, column in self.columns.items():
+            column.append(getattr(listing, field))
+        self.price_cents.append(NO_PRICE if listing.price_cents is None else listing.price_cents)
+        self.likes.append(listing.likes or 0)
+
+    def extend(self, listings):
+        for listing in listings:
+            self.append(listing)
+
+    def prices(self):
+        return [cents for cents in self.price_cents if cents != NO_PRICE]
+
+    def dedup(self, seen):
+        # Drops listings whose URL is already in `seen` (and within the batch), updating `seen`
+        keep = []
+        for i, url in enumerate(self.columns["url"]):
+            if url is not None:
+                if url in seen:
+                    continue
+                seen.add(url)
+            keep.append(i)
+        if len(keep) == len(self):
+            return self
+        unique = ListingBatch()
+        unique.columns = {field: [column[i] for i in keep] for field, column in self.columns.items()}
+        unique.price_cents = array("q", (self.price_cents[i] for i in keep))
+        unique.likes = array("q", (self.likes[i] for i in keep))
+        return unique
+
+    def column(self, name, missing=MISSING):
+        if name == "Price":
+            values = [format_price(cents, currency) for cents, currency in zip(self.price_cents, self.columns["currency"])]
+        elif name == "PriceCents":
+            return [None if cents == NO_PRICE else cents for cents in self.price_cents]
+        elif name == "Likes":
+            return self.likes
+        else:
+            values = self.columns[COLUMNS[name]]
+        if missing is None:
+            return values
+        return [missing if value is None else value for value in values]
+
+    def rows(self, fieldnames, missing=MISSING):
+        return zip(*(self.column(name, missing) for name in fieldnames))
+
+    def write_csv(self, writer, fieldnames):
+        # writer is a plain csv.writer whose header matches fieldnames
+        writer.writerows(self.rows(fieldnames))
+
+    def to_sqlite(self, conn, table, fieldnames):
+        placeholders = ", ".join("?" for _ in fieldnames)
+        conn.executemany(
+            f"INSERT INTO {table} ({', '.join(fieldnames)}) VALUES ({placeholders})",
+            self.rows(fieldnames, missing=None),
+        )
+
+class ParquetSink:
+    def __init__(self, path, fieldnames):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet output requires pyarrow (pip install pyarrow)") from e
+        self.pa = pa
+        self.fieldnames = list(fieldnames)
+        int_fields = {"Likes", "PriceCents"}
+        self.schema = pa.schema([(name, pa.int64() if name in int_fields else pa.string()) for name in self.fieldnames])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, batch):
+        if not len(batch):
+            return
+        arrays = [self.pa.array(list(batch.column(name, missing=None)), type=field.type) for name, field in zip(self.fieldnames, self.schema)]
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
@@ -0,0 +1,185 @@
+import cProfile
+import json
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = time.time()
+            self.counters = {}
+            self.gauges = {}
+            # name -> [count, total, min, max]
+            self.timings = {}
+
+    def inc(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name, value):
+        with self.lock:
+            self.gauges[name] = value
+
+    def observe(self, name, value):
+        with self.lock:
+            entry = self.timings.get(name)
+            if entry is None:
+                self.timings[name] = [1, value, value, value]
+            else:
+                entry[0] += 1
+                entry[1] += value
+                entry[2] = min(entry[2], value)
+                entry[3] = max(entry[3], value)
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def record_response(self, status_code, wire_bytes, body_bytes, elapsed=None):
+        self.inc("http_requests_total")
+        self.inc(f"http_status_{status_code}")
+        self.inc("http_bytes_wire", wire_bytes)
+        self.inc("http_bytes_in", body_bytes)
+        self.observe("page_bytes_wire", wire_bytes)
+        if elapsed is not None:
+            self.observe("fetch_seconds", elapsed)
+
+    def sleep(self, delay_range):
+        delay = random.uniform(*delay_range)
+        time.sleep(delay)
+        self.observe("sleep_seconds", delay)
+
+    def snapshot(self):
+        with self.lock:
+            timings = {
+                name: {
+                    "count": count,
+                    "sum": total,
+                    "avg": total / count if count else 0,
+                    "min": low,
+                    "max": high,
+                }
+                for name, (count, total, low, high) in self.timings.items()
+            }
+            return {
+                "timestamp": time.time(),
+                "uptime_seconds": time.time() - self.started,
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+                "timings": timings,
+            }
+
+    def to_prometheus(self, prefix="poshmark"):
+        snap = self.snapshot()
+        def metric_name(name):
+            return f"{prefix}_" + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+        lines = [f"{metric_name('uptime_seconds')} {snap['uptime_seconds']:.3f}"]
+        for name, value in sorted(snap["counters"].items()):
+            lines.append(f"# TYPE {metric_name(name)} counter")
+            lines.append(f"{metric_name(name)} {value}")
+        for name, value in sorted(snap["gauges"].items()):
+            lines.append(f"# TYPE {metric_name(name)} gauge")
+            lines.append(f"{metric_name(name)} {value}")
+        for name, stats in sorted(snap["timings"].items()):
+            base = metric_name(name)
+            lines.append(f"# TYPE {base} summary")
+            lines.append(f"{base}_count {stats['count']}")
+            lines.append(f"{base}_sum {stats['sum']:.6f}")
+            lines.append(f"# TYPE {base}_min gauge")
+            lines.append(f"{base}_min {stats['min']:.6f}")
+            lines.append(f"# TYPE {base}_max gauge")
+            lines.append(f"{base}_max {stats['max']:.6f}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        # .prom/.txt -> Prometheus textfile collector format, anything else -> JSON
+        if path.endswith((".prom", ".txt")):
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.snapshot(), indent=2)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def start_periodic(self, path, interval=30):
+        stop = threading.Event()
+        def loop():
+            while not stop.wait(interval):
+                try:
+                    self.write(path)
+                except Exception as e:
+                    print(f"❌ Error writing metrics to {path}: {e}")
+        thread = threading.Thread(target=loop, name="metrics-writer", daemon=True)
+        thread.start()
+        return stop
+
+METRICS = Metrics()
+
+@contextmanager
+def profiled(profile_file=None):
+    if not profile_file:
+        yield
+        return
+    # Before 3.12 cProfile only sees the thread that enabled it, and the scrapers do their fetching
+    # and parsing in pool threads, so every thread started during the run gets its own profiler.
+    # From 3.12 one profiler covers every thread and a second enable() raises ValueError.
+    per_thread = sys.version_info < (3, 12)
+    thread_profilers = []
+    lock = threading.Lock()
+    def start_thread_profiler(frame, event, arg):
+        profiler = cProfile.Profile()
+        try:
+            # Replaces this hook for the rest of the thread's life
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active; leave the thread unprofiled rather than kill it
+            sys.setprofile(None)
+            return
+        with lock:
+            thread_profilers.append(profiler)
+    profiler = cProfile.Profile()
+    if per_thread:
+        threading.setprofile(start_thread_profiler)
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        if per_thread:
+            threading.setprofile(None)
+        stats = pstats.Stats(profiler)
+        with lock:
+            for thread_profiler in thread_profilers:
+                stats.add(thread_profiler)
+        stats.dump_stats(profile_file)
+        threads = f" ({len(thread_profilers)} worker threads)" if per_thread else ""
+        print(f"Saved profile to {profile_file}{threads}")
+
+@contextmanager
+def metrics_run(metrics_file=None, interval=30, profile_file=None):
+    METRICS.reset()
+    stop = METRICS.start_periodic(metrics_file, interval) if metrics_file and interval else None
+    try:
+        with profiled(profile_file):
+            yield METRICS
+    finally:
+        if stop:
+            stop.set()
+        if metrics_file:
+            METRICS.write(metrics_file)
+            print(f"Saved metrics to {metrics_file}")
@@ -1,4 +1,12 @@
 import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from query_plan import load_counts, plan_queries
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+COUNTS_FILE = "query_counts.json"
 
 # --- Category Setup ---
 
@@ -57,33 +65,48 @@ custom_brands = {
 
 # --- Generate Configs ---
 
-category_configs = []
-
-for cat, sub_type in categories.items():
-    is_men = "Men" in cat
-    group = "men" if is_men else "women"
-    color_list = custom_colors.get(cat, [])
-    brand_list = custom_brands.get(cat, [])
-
-    category_configs.append({
-        "name": cat,
-        "colors": color_list,
-        "sizes": sizes[group][sub_type],
-        "brands": brand_list
-    })
+def build_category_configs():
+    category_configs = []
+    for cat, sub_type in categories.items():
+        is_men = "Men" in cat
+        group = "men" if is_men else "women"
+        color_list = custom_colors.get(cat, [])
+        brand_list = custom_brands.get(cat, [])
+
+        category_configs.append({
+            "name": cat,
+            "colors": color_list,
+            "sizes": sizes[group][sub_type],
+            "brands": brand_list
+        })
+    return category_configs
 
 # --- Final Config Output ---
 
-config = {
-    "categories": category_configs,
-    "price_range": [0, 15],
-    "price_step": 3,
-    "sort_by": "like_count",
-    "max_pages": 50,
-    "max_workers": 20
-}
+if __name__ == "__main__":
+    category_configs = build_category_configs()
+    price_range = [0, 15]
+    price_step = 3
+    max_pages = 50
+
+    # Result counts are recorded by item_scrape.py after each run
+    counts = load_counts(os.path.join(SCRIPT_DIR, COUNTS_FILE))
+    queries = plan_queries(category_configs, price_range, price_step, max_pages, counts)
+
+    config = {
+        "categories": category_configs,
+        "queries": queries,
+        "price_range": price_range,
+        "price_step": price_step,
+        "sort_by": "like_count",
+        "max_pages": max_pages,
+        "max_workers": 20,
+        "dedup": 1,
+        "counts_file": COUNTS_FILE
+    }
 
-with open("item_params_generated.json", "w") as f:
-    json.dump(config, f, indent=2)
+    with open("item_params_generated.json", "w") as f:
+        json.dump(config, f, indent=2)
 
-print(f"✅ Generated item_params_generated.json with {len(category_configs)} categories.")
+    total_pages = sum(q["max_pages"] for q in queries)
+    print(f"✅ Generated item_params_generated.json with {len(category_configs)} categories, {len(queries)} queries ({total_pages} pages, {len(counts)} stored counts).")
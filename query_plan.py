@@ -0,0 +1,145 @@
+import json
+import math
+import os
+from datetime import datetime
+
+PAGE_SIZE = 48
+
+def query_key(category, sizes, price_range):
+    return f"{category}|{','.join(sizes)}|{price_range[0]}-{price_range[1]}"
+
+def load_counts(path):
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+def save_counts(path, counts):
+    # Merges this run's results into the store, newer entries win
+    stored = load_counts(path)
+    stored.update(counts)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(stored, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def record_count(counts, category, sizes, price_range, rows, saturated):
+    counts[query_key(category, sizes, price_range)] = {
+        "rows": rows,
+        "saturated": saturated,
+        "updated": datetime.now().strftime("%Y-%m-%d_%H-%M-%S"),
+    }
+
+def parent_category(name, names):
+    parts = name.split("-")
+    for i in range(len(parts) - 1, 0, -1):
+        parent = "-".join(parts[:i])
+        if parent in names:
+            return parent
+    return None
+
+def remove_overlaps(category_configs):
+    # A parent category crawl already returns its children's listings, so children only
+    # keep the sizes their parent doesn't cover (and are dropped if nothing is left)
+    by_name = {c["name"]: c for c in category_configs}
+    planned = []
+    for config in category_configs:
+        parent_name = parent_category(config["name"], by_name)
+        parent = by_name.get(parent_name)
+        if parent is None:
+            planned.append(config)
+            continue
+        same_filters = all(not parent.get(key) or parent.get(key) == config.get(key) for key in ("colors", "brands"))
+        if not same_filters:
+            planned.append(config)
+            continue
+        if not parent.get("sizes"):
+            continue
+        if not config.get("sizes"):
+            planned.append(config)
+            continue
+        remaining = [size for size in config["sizes"] if size not in parent["sizes"]]
+        if remaining:
+            planned.append({**config, "sizes": remaining})
+    return planned
+
+def known_buckets(counts, category, sizes):
+    prefix = f"{category}|{','.join(sizes)}|"
+    buckets = []
+    for key, entry in counts.items():
+        if not key.startswith(prefix):
+            continue
+        lo, hi = (int(x) for x in key[len(prefix):].split("-"))
+        buckets.append((entry.get("updated", ""), lo, hi, entry["rows"], entry.get("saturated", False)))
+    # Overlapping measurements: the most recent wins (narrowest first within a run), so a merged
+    # query that came back saturated replaces the narrow counts it was planned from
+    buckets.sort(key=lambda b: b[2] - b[1])
+    buckets.sort(key=lambda b: b[0], reverse=True)
+    chosen = []
+    for _, lo, hi, rows, saturated in buckets:
+        if all(hi < c[0] or lo > c[1] for c in chosen):
+            chosen.append((lo, hi, rows, saturated))
+    return chosen
+
+def estimate_rows(buckets, lo, hi):
+    total = 0
+    covered = 0
+    saturated = False
+    for blo, bhi, rows, bucket_saturated in buckets:
+        start, end = max(lo, blo), min(hi, bhi)
+        if start > end:
+            continue
+        if bucket_saturated:
+            # Only a lower bound: says nothing about how its rows split across a narrower range
+            if lo > blo or hi < bhi:
+                return None, False
+            saturated = True
+        total += rows * (end - start + 1) / (bhi - blo + 1)
+        covered += end - start + 1
+    if covered < hi - lo + 1:
+        return None, False
+    return total, saturated
+
+def plan_price_ranges(buckets, lo, hi, capacity, step, origin=None):
+    # Returns [(lo, hi, estimated_rows)], estimate is None where there is no usable history
+    origin = lo if origin is None else origin
+    estimate, saturated = estimate_rows(buckets, lo, hi)
+    if estimate is None:
+        # Unmeasured ranges fall back to the fixed price_step grid
+        grid = [start for start in range(origin, hi + 1, step) if lo < start <= hi]
+        if grid:
+            bounds = [lo] + grid + [hi + 1]
+            ranges = []
+            for start, end in zip(bounds, bounds[1:]):
+                ranges += plan_price_ranges(buckets, start, end - 1, capacity, step, origin)
+            return ranges
+        return [(lo, hi, None)]
+    if (saturated or estimate > capacity) and hi > lo:
+        mid = (lo + hi) // 2
+        return plan_price_ranges(buckets, lo, mid, capacity, step, origin) + plan_price_ranges(buckets, mid + 1, hi, capacity, step, origin)
+    if saturated:
+        # Can't split further and the stored rows are only a lower bound, so don't size from them
+        return [(lo, hi, None)]
+    return [(lo, hi, estimate)]
+
+def page_budget(estimate, max_pages, headroom=1.2):
+    if estimate is None:
+        return max_pages
+    return min(max_pages, max(1, math.ceil(estimate * headroom / PAGE_SIZE)))
+
+def plan_queries(category_configs, price_range, price_step, max_pages, counts, headroom=1.2):
+    capacity = max_pages * PAGE_SIZE
+    step = price_step or (price_range[1] - price_range[0] + 1)
+    queries = []
+    for config in remove_overlaps(category_configs):
+        buckets = known_buckets(counts, config["name"], config.get("sizes", []))
+        for lo, hi, estimate in plan_price_ranges(buckets, price_range[0], price_range[1], capacity, step):
+            queries.append({
+                "category": config["name"],
+                "colors": config.get("colors", []),
+                "sizes": config.get("sizes", []),
+                "brands": config.get("brands", []),
+                "price_range": [lo, hi],
+                "max_pages": page_budget(estimate, max_pages, headroom),
+            })
+    return queries
@@ -1,17 +1,17 @@
 import csv
 import os
-import time
 import json
-import requests
 import re
-import random
 from datetime import datetime
-import pandas as pd
 from bs4 import BeautifulSoup
 import urllib.parse
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from tqdm import tqdm
+from itertools import islice
 import gc
+from metrics import METRICS, metrics_run
+from fetch import STOP_MARKERS, enable_conditional_fetch, fetch_page
+from listing import Listing, ListingBatch
 
 def find_latest_csv(prefix="poshmark_listings_", extension=".csv"):
     files = [f for f in os.listdir(".") if f.startswith(prefix) and f.endswith(extension)]
@@ -48,38 +48,35 @@ def extract_stats_from_profile(html):
     del soup
     return stats
 
-def extract_listing_data(listing):
-    def safe_text(tag):
-        return tag.text.strip() if tag else "N/A"
-    title_tag = listing.find("a", class_="tile__title")
-    price_tag = listing.find("span", class_="p--t--1 fw--bold")
-    link_tag = listing.find("a", class_="tile__covershot")
-    size_tag = listing.find("a", class_="tile__details__pipe__size")
-    brand_tag = listing.find("a", class_="tile__details__pipe__brand")
-    seller_tag = listing.find("a", class_="tile__creator")
-    img_tag = listing.find("img")
-    like_tag = listing.find("div", class_="social-action-bar__like")
-    like_span = like_tag.find("span") if like_tag else None
-    image_url = img_tag.get("src") or img_tag.get("data-src") if img_tag else "N/A"
-    category_tag = listing.find(attrs={"data-et-prop-category_id": True})
-    category_id = category_tag["data-et-prop-category_id"] if category_tag else "N/A"
-    category_name = "N/A"
-    if size_tag and size_tag.has_attr("href"):
-        match = re.search(r"/category/([^/?#]+)", size_tag["href"])
-        if match:
-            category_name = match.group(1).replace("-", " > ").replace("_", " ")
-    return {
-        "Title": safe_text(title_tag),
-        "Price": safe_text(price_tag),
-        "Size": safe_text(size_tag).replace("Size: ", ""),
-        "Brand": safe_text(brand_tag),
-        "Image": image_url,
-        "Likes": like_span.text.strip() if like_span and like_span.text.strip().isdigit() else "0",
-        "ItemURL": f"https://poshmark.com{link_tag['href']}" if link_tag else "N/A",
-        "CategoryID": category_id,
-        "CategoryName": category_name,
-        "Seller": safe_text(seller_tag),
-    }
+def iter_sellers(input_file):
+    # Streams unique sellers in first-seen order, reading only the Seller column
+    seen = set()
+    with open(input_file, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        if "Seller" not in header:
+            print(f"No Seller column in {input_file}")
+            return
+        col = header.index("Seller")
+        for row in reader:
+            if len(row) <= col:
+                continue
+            seller = row[col].strip()
+            if seller and seller != "N/A" and seller not in seen:
+                seen.add(seller)
+                yield seller
+
+def submit_bounded(executor, fn, args_iter, window):
+    # Keeps at most `window` futures in flight and yields them as they complete
+    args_iter = iter(args_iter)
+    pending = {executor.submit(fn, *args) for args in islice(args_iter, window)}
+    while pending:
+        METRICS.set_gauge("queue_depth", len(pending))
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for args in islice(args_iter, len(done)):
+            pending.add(executor.submit(fn, *args))
+        yield from done
+    METRICS.set_gauge("queue_depth", 0)
 
 def build_seller_url(seller, closet_params=None, page=None):
     base_url = f"https://poshmark.com/closet/{seller}"
@@ -93,45 +90,78 @@ def build_seller_url(seller, closet_params=None, page=None):
         return f"{base_url}?max_id={page}"
     return base_url
 
-def scrape_all_seller_items(seller, headers, closet_params, max_pages, delay_range, item_output_folder):
+def scrape_all_seller_items(seller, headers, closet_params, max_pages, delay_range, item_output_folder, stop_markers=STOP_MARKERS):
     stats = {"Listings": "N/A", "Followers": "N/A", "Following": "N/A"}
+    item_count = 0
+    price_count = 0
+    price_total = 0
+    min_price = None
+    max_price = None
+    # Complete only if the closet ran out on a short page; capped or errored crawls miss listings
+    complete = False
     item_filename = get_unique_filename(os.path.join(item_output_folder, f"items_{seller}.csv"))
     fieldnames = ["Title", "Price", "Size", "Brand", "Image", "Likes", "ItemURL", "CategoryID", "CategoryName", "Seller"]
     with open(item_filename, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
+        writer = csv.writer(f)
+        writer.writerow(fieldnames)
         for page in range(1, max_pages + 1 if max_pages else 999):
             url = build_seller_url(seller, closet_params, page=page)
             try:
-                response = requests.get(url, headers=headers, timeout=15)
-                response.raise_for_status()
-                if page == 1:
-                    stats = extract_stats_from_profile(response.text)
-                soup = BeautifulSoup(response.text, "html.parser")
-                listings = soup.find_all("div", {"data-et-name": "listing"})
+                html = fetch_page(url, headers=headers, timeout=15, stop_markers=stop_markers)
+                with METRICS.timer("parse_seconds"):
+                    if page == 1:
+                        stats = extract_stats_from_profile(html)
+                    soup = BeautifulSoup(html, "html.parser")
+                    listings = soup.find_all("div", {"data-et-name": "listing"})
+                    batch = ListingBatch(Listing.from_tile(l) for l in listings)
+                METRICS.observe("rows_per_page", len(batch))
                 if not listings:
+                    complete = True
                     break
-                items = [extract_listing_data(l) for l in listings]
-                writer.writerows(items)
+                with METRICS.timer("write_seconds"):
+                    batch.write_csv(writer, fieldnames)
+                METRICS.inc("pages_scraped")
+                METRICS.inc("rows_written", len(batch))
+                item_count += len(batch)
+                prices = batch.prices()
+                if prices:
+                    price_count += len(prices)
+                    price_total += sum(prices)
+                    min_price = min(prices) if min_price is None else min(min_price, min(prices))
+                    max_price = max(prices) if max_price is None else max(max_price, max(prices))
                 soup.decompose()
                 del soup
                 if len(listings) < 48:
+                    complete = True
                     break
-                time.sleep(random.uniform(*delay_range))
-                gc.collect()
+                METRICS.sleep(delay_range)
+                with METRICS.timer("gc_seconds"):
+                    gc.collect()
             except Exception as e:
+                METRICS.inc("page_errors")
                 print(f"❌ Error on page {page} for seller {seller}: {e}")
                 break
+    # Closet filters (price, availability, size...) hide listings that still exist
+    filtered = any(key != "sort_by" for key in (closet_params or {}))
+    stats["Complete"] = 1 if complete and not filtered else 0
+    stats["ItemCount"] = item_count
+    stats["MinPrice"] = min_price / 100 if min_price is not None else "N/A"
+    stats["MaxPrice"] = max_price / 100 if max_price is not None else "N/A"
+    stats["AvgPrice"] = round(price_total / price_count / 100, 2) if price_count else "N/A"
     return stats, item_filename
 
-def process_single_seller(i, seller, headers, closet_params, max_pages, delay_range, item_output_folder):
-    stats, item_filename = scrape_all_seller_items(seller, headers, closet_params, max_pages, delay_range, item_output_folder)
+def process_single_seller(i, seller, headers, closet_params, max_pages, delay_range, item_output_folder, stop_markers=STOP_MARKERS):
+    stats, item_filename = scrape_all_seller_items(seller, headers, closet_params, max_pages, delay_range, item_output_folder, stop_markers)
     return {
         "Seller": seller,
         "Listings": stats.get("Listings", "N/A"),
         "Followers": stats.get("Followers", "N/A"),
         "Following": stats.get("Following", "N/A"),
-        "ItemCount": sum(1 for _ in open(item_filename)) - 1,
+        "ItemCount": stats.get("ItemCount", 0),
+        "MinPrice": stats.get("MinPrice", "N/A"),
+        "MaxPrice": stats.get("MaxPrice", "N/A"),
+        "AvgPrice": stats.get("AvgPrice", "N/A"),
+        "Complete": stats.get("Complete", 0),
         "URL": build_seller_url(seller),
         "ItemCSV": item_filename,
     }
@@ -146,6 +176,12 @@ def scrape_seller_profiles(params):
     seller_range = params.get("seller_range", [1, None])
     max_pages = params.get("max_pages")
     max_workers = params.get("max_workers", 5)
+    streaming = params.get("streaming", 0)
+    max_pending = params.get("max_pending") or max_workers * 2
+    # partial_fetch stops reading each page once the listing grid has been received
+    stop_markers = STOP_MARKERS if params.get("partial_fetch", 1) else ()
+    if params.get("conditional_fetch"):
+        enable_conditional_fetch(params.get("conditional_cache_mb", 64) * 1024 * 1024)
 
     if not input_file:
         input_file = find_latest_csv()
@@ -165,26 +201,37 @@ def scrape_seller_profiles(params):
         print(f"Input file not found: {input_file}")
         return
 
-    df = pd.read_csv(input_file)
-    sellers = sorted(set(df["Seller"].dropna()))
-
     start_index = max(0, seller_range[0] - 1)
-    end_index = seller_range[1] if seller_range[1] is not None else len(sellers)
-    selected_sellers = sellers[start_index:end_index]
+    end_index = seller_range[1]
+    if streaming:
+        # Sellers are taken in first-seen order so seller_range never needs the whole list
+        selected_sellers = islice(iter_sellers(input_file), start_index, end_index)
+        total = None
+    else:
+        with METRICS.timer("load_input_seconds"):
+            sellers = sorted(iter_sellers(input_file))
+        selected_sellers = sellers[start_index:end_index]
+        total = len(selected_sellers)
 
     headers = {"User-Agent": "Mozilla/5.0"}
-    keys = ["Seller", "Listings", "Followers", "Following", "ItemCount", "URL", "ItemCSV"]
+    keys = ["Seller", "Listings", "Followers", "Following", "ItemCount", "MinPrice", "MaxPrice", "AvgPrice", "Complete", "URL", "ItemCSV"]
+    if write_mode == "a":
+        # Keep the existing summary's columns so older files stay aligned
+        with open(summary_output_file, newline="", encoding="utf-8") as f:
+            keys = next(csv.reader(f), None) or keys
     with open(summary_output_file, write_mode, newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=keys)
+        writer = csv.DictWriter(f, fieldnames=keys, extrasaction="ignore")
         if write_mode == "w":
             writer.writeheader()
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = [executor.submit(process_single_seller, i + start_index + 1, seller, headers, closet_params, max_pages, delay_range, item_output_folder) for i, seller in enumerate(selected_sellers)]
-            for future in tqdm(as_completed(futures), total=len(futures), desc="Scraping Sellers", unit="seller"):
+            jobs = ((i + start_index + 1, seller, headers, closet_params, max_pages, delay_range, item_output_folder, stop_markers) for i, seller in enumerate(selected_sellers))
+            for future in tqdm(submit_bounded(executor, process_single_seller, jobs, max_pending), total=total, desc="Scraping Sellers", unit="seller"):
                 try:
                     row = future.result()
                     writer.writerow(row)
+                    METRICS.inc("sellers_scraped")
                 except Exception as e:
+                    METRICS.inc("seller_errors")
                     print(f"❌ Error in thread: {e}")
     print(f"\n✅ Saved summary to {summary_output_file} and item files to {item_output_folder}/")
 
@@ -198,4 +245,5 @@ if __name__ == "__main__":
     PARAMS_FOLDER = "params"
     PARAMS_FILE = "seller_params.json"
     params = load_params(PARAMS_FOLDER, PARAMS_FILE)
-    scrape_seller_profiles(params)
+    with metrics_run(params.get("metrics_file"), params.get("metrics_interval", 30), params.get("profile_file")):
+        scrape_seller_profiles(params)
@@ -0,0 +1,233 @@
+import argparse
+import csv
+import gzip
+import json
+import os
+import re
+import sqlite3
+from datetime import datetime
+from listing import Listing, ListingBatch, format_price, parse_price_cents
+
+# A snapshot store keeps only what changed between crawls:
+#   <store>/changes/<run>.jsonl.gz  append-only log of new/price/likes/gone/back events
+#   <store>/index.db                latest known state per listing + price change index
+
+LOOKUP_CHUNK = 500
+
+def listing_key(url):
+    # Poshmark listing URLs end in a 24 hex-digit id, which is stable across title edits
+    if not url:
+        return None
+    match = re.search(r"([0-9a-f]{24})(?:[/?#]|$)", url)
+    return match.group(1) if match else url
+
+class SnapshotStore:
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.join(path, "changes"), exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(path, "index.db"))
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                run TEXT PRIMARY KEY,
+                listings INTEGER,
+                changes INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS state (
+                key TEXT PRIMARY KEY,
+                seller TEXT,
+                url TEXT,
+                price_cents INTEGER,
+                likes INTEGER,
+                last_run TEXT,
+                gone INTEGER DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS state_seller ON state (seller);
+            CREATE TABLE IF NOT EXISTS price_changes (
+                run TEXT,
+                key TEXT,
+                old_price INTEGER,
+                new_price INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS price_changes_run ON price_changes (run, new_price);
+        """)
+        self.run = None
+        self.log = None
+
+    def close(self):
+        if self.log:
+            self.log.close()
+        self.conn.close()
+
+    def begin_run(self, run=None):
+        self.run = run or datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        self.log = gzip.open(os.path.join(self.path, "changes", f"{self.run}.jsonl.gz"), "at", encoding="utf-8")
+        self.seen_sellers = set()
+        self.listing_count = 0
+        self.change_count = 0
+        return self.run
+
+    def log_event(self, event, key, **values):
+        self.log.write(json.dumps({"e": event, "k": key, **values}, separators=(",", ":")) + "\n")
+        self.change_count += 1
+
+    def add(self, batch):
+        urls = batch.column("URL", missing=None)
+        keys = [listing_key(url) for url in urls]
+        sellers = batch.column("Seller", missing=None)
+        prices = batch.column("PriceCents")
+        likes = batch.likes
+
+        known = {}
+        lookup = [key for key in set(keys) if key]
+        for i in range(0, len(lookup), LOOKUP_CHUNK):
+            chunk = lookup[i:i + LOOKUP_CHUNK]
+            rows = self.conn.execute(
+                f"SELECT key, price_cents, likes, gone FROM state WHERE key IN ({', '.join('?' for _ in chunk)})", chunk
+            )
+            known.update((row[0], row[1:]) for row in rows)
+
+        updates = []
+        price_changes = []
+        for key, url, seller, price, like_count in zip(keys, urls, sellers, prices, likes):
+            if not key:
+                continue
+            self.listing_count += 1
+            if seller:
+                self.seen_sellers.add(seller)
+            previous = known.get(key)
+            if previous is None:
+                self.log_event("new", key, s=seller, u=url, p=price, l=like_count)
+            else:
+                old_price, old_likes, gone = previous
+                if gone:
+                    self.log_event("back", key, p=price, l=like_count)
+                if price != old_price:
+                    self.log_event("price", key, p=price, op=old_price)
+                    if price is not None and old_price is not None:
+                        price_changes.append((self.run, key, old_price, price))
+                if like_count != old_likes:
+                    self.log_event("likes", key, l=like_count, ol=old_likes)
+            # Later duplicates within the run compare against what we just saw
+            known[key] = (price, like_count, 0)
+            updates.append((key, seller, url, price, like_count, self.run))
+
+        self.conn.executemany("""
+            INSERT INTO state (key, seller, url, price_cents, likes, last_run, gone) VALUES (?, ?, ?, ?, ?, ?, 0)
+            ON CONFLICT(key) DO UPDATE SET
+                seller = excluded.seller, url = excluded.url, price_cents = excluded.price_cents,
+                likes = excluded.likes, last_run = excluded.last_run, gone = 0
+        """, updates)
+        self.conn.executemany("INSERT INTO price_changes VALUES (?, ?, ?, ?)", price_changes)
+
+    def finish_run(self, missing="none", complete_sellers=None):
+        # missing: "none" skips disappearance tracking (safe for capped or filtered crawls),
+        # "seller" marks unseen listings of fully crawled sellers as gone, "all" marks every
+        # unseen listing gone. complete_sellers limits "seller" to closets crawled to the end
+        # without filters; without it every seller seen this run is trusted to be complete.
+        if missing == "all":
+            gone = self.conn.execute("SELECT key FROM state WHERE gone = 0 AND last_run != ?", (self.run,)).fetchall()
+        elif missing == "seller":
+            gone = []
+            sellers = list(self.seen_sellers if complete_sellers is None else complete_sellers)
+            for i in range(0, len(sellers), LOOKUP_CHUNK):
+                chunk = sellers[i:i + LOOKUP_CHUNK]
+                gone += self.conn.execute(
+                    f"SELECT key FROM state WHERE gone = 0 AND last_run != ? AND seller IN ({', '.join('?' for _ in chunk)})",
+                    [self.run] + chunk,
+                ).fetchall()
+        else:
+            gone = []
+        for (key,) in gone:
+            self.log_event("gone", key)
+        self.conn.executemany("UPDATE state SET gone = 1 WHERE key = ?", gone)
+        self.conn.execute("INSERT OR REPLACE INTO runs VALUES (?, ?, ?)", (self.run, self.listing_count, self.change_count))
+        self.conn.commit()
+        self.log.close()
+        self.log = None
+        return self.change_count
+
+    def runs(self):
+        return [row[0] for row in self.conn.execute("SELECT run FROM runs ORDER BY run")]
+
+    def price_drops(self, below_cents, since=None):
+        # Listings now priced under below_cents that got cheaper after `since` (default: the previous run)
+        if since is None:
+            runs = self.runs()
+            if len(runs) < 2:
+                return []
+            since = runs[-2]
+        return self.conn.execute("""
+            SELECT s.key, s.seller, s.url, first.old_price, s.price_cents
+            FROM state s
+            JOIN (
+                SELECT key, old_price, MIN(run) FROM price_changes WHERE run > ? GROUP BY key
+            ) first ON first.key = s.key
+            WHERE s.gone = 0 AND s.price_cents < ? AND s.price_cents < first.old_price
+            ORDER BY s.price_cents
+        """, (since, below_cents)).fetchall()
+
+    def changes(self, run):
+        with gzip.open(os.path.join(self.path, "changes", f"{run}.jsonl.gz"), "rt", encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+def latest_item_files(folder):
+    # seller_scrape writes a new items_<seller>_<timestamp>.csv on every crawl, so a run only
+    # takes each seller's newest file; older crawls would replay stale prices and hide sold listings
+    latest = {}
+    for name in os.listdir(folder):
+        match = re.fullmatch(r"items_(.+?)(?:_(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}))?\.csv", name)
+        if not match:
+            continue
+        seller, timestamp = match.group(1), match.group(2) or ""
+        if seller not in latest or timestamp > latest[seller][0]:
+            latest[seller] = (timestamp, name)
+    return [os.path.join(folder, name) for _, name in sorted(latest.values(), key=lambda entry: entry[1])]
+
+def read_csv_batch(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return ListingBatch(Listing.from_row(row) for row in csv.DictReader(f))
+
+def record_files(store_path, paths, missing="none"):
+    store = SnapshotStore(store_path)
+    try:
+        run = store.begin_run()
+        for path in paths:
+            store.add(read_csv_batch(path))
+        changes = store.finish_run(missing)
+    finally:
+        store.close()
+    print(f"✅ Recorded run {run}: {changes:,} changes")
+    return run
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record listing CSVs into a snapshot store and query price history.")
+    parser.add_argument("--store", type=str, default="snapshots", help="Snapshot store directory")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record = subparsers.add_parser("record", help="Record a crawl (item CSVs) as a new run")
+    record.add_argument("--folder", type=str, default="", help="Folder of items_*.csv files (newest file per seller)")
+    record.add_argument("files", nargs="*", help="Listing CSV files")
+    record.add_argument("--missing", choices=["seller", "all", "none"], default="none",
+                        help="Which unseen listings count as gone; 'seller' is only safe for uncapped, unfiltered closet crawls")
+
+    drops = subparsers.add_parser("drops", help="Listings whose price dropped below a threshold")
+    drops.add_argument("--below", type=str, required=True, help="Price threshold in dollars, e.g. 10")
+    drops.add_argument("--since", type=str, default=None, help="Run id to compare against (default: previous run)")
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        paths = list(args.files)
+        if args.folder:
+            paths += latest_item_files(args.folder)
+        record_files(args.store, paths, args.missing)
+    elif args.command == "drops":
+        store = SnapshotStore(args.store)
+        try:
+            for key, seller, url, old_price, price in store.price_drops(parse_price_cents(args.below), args.since):
+                print(f"{format_price(old_price)} -> {format_price(price)}  {seller}  {url or key}")
+        finally:
+            store.close()
+
+if __name__ == "__main__":
+    main()
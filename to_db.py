@@ -1,10 +1,13 @@
 import os
 import sqlite3
-import pandas as pd
 import argparse
+import csv
 import re
 from datetime import datetime
 from tqdm import tqdm
+from metrics import METRICS, metrics_run
+from listing import Listing, ListingBatch
+from snapshots import SnapshotStore, latest_item_files
 
 def find_latest_profiles_csv(prefix="seller_profiles_", extension=".csv"):
     files = [f for f in os.listdir(".") if f.startswith(prefix) and f.endswith(extension)]
@@ -26,13 +29,18 @@ def find_latest_profiles_csv(prefix="seller_profiles_", extension=".csv"):
     timestamped.sort(reverse=True)
     return timestamped[0][1]
 
-def create_database_from_folder(item_folder, profiles_csv=None, db_path="poshmark_listings.db", include_media=False):
+def create_database_from_folder(item_folder, profiles_csv=None, db_path="poshmark_listings.db", include_media=False, snapshot_store=None):
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
+    complete_sellers = set()
+    run_files = None
 
     # Create sellers table if profiles provided
     if profiles_csv and os.path.exists(profiles_csv):
-        seller_df = pd.read_csv(profiles_csv)
+        with open(profiles_csv, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            seller_columns = next(reader, [])
+            seller_rows = [[None if value in ("", "N/A") else value for value in row] for row in reader]
         cursor.execute("""
         CREATE TABLE IF NOT EXISTS sellers (
             Seller TEXT PRIMARY KEY,
@@ -40,12 +48,28 @@ def create_database_from_folder(item_folder, profiles_csv=None, db_path="poshmar
             Followers TEXT,
             Following TEXT,
             ItemCount INTEGER,
+            MinPrice REAL,
+            MaxPrice REAL,
+            AvgPrice REAL,
+            Complete INTEGER,
             URL TEXT,
             ItemCSV TEXT
         )
         """)
+        # Older databases predate the price summary columns
+        existing = {row[1] for row in cursor.execute("PRAGMA table_info(sellers)")}
+        for col in seller_columns:
+            if col not in existing:
+                cursor.execute(f"ALTER TABLE sellers ADD COLUMN {col}")
         cursor.execute("DELETE FROM sellers")
-        seller_df.to_sql("sellers", conn, if_exists="append", index=False)
+        placeholders = ", ".join("?" for _ in seller_columns)
+        cursor.executemany(f"INSERT INTO sellers ({', '.join(seller_columns)}) VALUES ({placeholders})", seller_rows)
+        if "Complete" in seller_columns:
+            seller_col, complete_col = seller_columns.index("Seller"), seller_columns.index("Complete")
+            complete_sellers = {row[seller_col] for row in seller_rows if len(row) > complete_col and row[complete_col] == "1"}
+        if "ItemCSV" in seller_columns:
+            item_col = seller_columns.index("ItemCSV")
+            run_files = {os.path.basename(row[item_col]) for row in seller_rows if len(row) > item_col and row[item_col]}
         print(f"✅ Seller profiles loaded from {profiles_csv}")
 
     # Define listing schema
@@ -53,6 +77,7 @@ def create_database_from_folder(item_folder, profiles_csv=None, db_path="poshmar
         ("Seller", "TEXT"),
         ("Title", "TEXT"),
         ("Price", "TEXT"),
+        ("PriceCents", "INTEGER"),
         ("Size", "TEXT"),
         ("Brand", "TEXT"),
         ("Likes", "INTEGER"),
@@ -71,44 +96,66 @@ def create_database_from_folder(item_folder, profiles_csv=None, db_path="poshmar
         )
     """)
 
+    listing_fields = [col for col, _ in listing_columns]
+    # The listings table is rebuilt every time, so history lives in the snapshot store
+    store = SnapshotStore(snapshot_store) if snapshot_store else None
+    if store:
+        store.begin_run()
     total_inserted = 0
-    files = [f for f in os.listdir(item_folder) if f.endswith(".csv") and f.startswith("items_")]
+    files = sorted(f for f in os.listdir(item_folder) if f.endswith(".csv") and f.startswith("items_"))
+    if store and run_files is None:
+        run_files = {os.path.basename(path) for path in latest_item_files(item_folder)}
 
     for fname in tqdm(files, desc="Importing listings", unit="file"):
         path = os.path.join(item_folder, fname)
         try:
-            df = pd.read_csv(path)
-            if "Seller" not in df.columns:
-                tqdm.write(f"❌ Skipping {fname} (no Seller column)")
-                continue
-
-            drop_cols = ["CategoryID"]
-            if not include_media:
-                drop_cols += ["Image", "ItemURL"]
-
-            for col in drop_cols:
-                if col in df.columns:
-                    df.drop(columns=col, inplace=True)
-
-            df.to_sql("listings", conn, if_exists="append", index=False)
-            total_inserted += len(df)
+            with METRICS.timer("read_csv_seconds"):
+                with open(path, newline="", encoding="utf-8") as f:
+                    reader = csv.DictReader(f)
+                    if "Seller" not in (reader.fieldnames or []):
+                        tqdm.write(f"❌ Skipping {fname} (no Seller column)")
+                        continue
+                    batch = ListingBatch(Listing.from_row(row) for row in reader)
+
+            with METRICS.timer("insert_seconds"):
+                batch.to_sqlite(conn, "listings", listing_fields)
+            # The folder keeps every past crawl; the snapshot run only takes this crawl's files
+            if store and fname in run_files:
+                with METRICS.timer("snapshot_seconds"):
+                    store.add(batch)
+            total_inserted += len(batch)
+            METRICS.inc("files_imported")
+            METRICS.inc("rows_inserted", len(batch))
         except Exception as e:
+            METRICS.inc("file_errors")
             tqdm.write(f"❌ Error with {fname}: {e}")
 
-    conn.commit()
+    with METRICS.timer("commit_seconds"):
+        conn.commit()
     conn.close()
     print(f"\n✅ Total inserted: {total_inserted:,} listings")
-
-def main():
+    if store:
+        # Only sellers whose closets were crawled to the end without filters can lose listings
+        changes = store.finish_run("seller", complete_sellers)
+        store.close()
+        METRICS.inc("snapshot_changes", changes)
+        print(f"✅ Recorded {changes:,} changes in snapshot store {snapshot_store}")
+
+def main(argv=None):
     parser = argparse.ArgumentParser(description="Create a SQLite database from seller item CSVs in a folder.")
     parser.add_argument("--folder", type=str, default="seller_items", help="Folder containing item CSVs")
     parser.add_argument("--profiles", type=str, default="", help="Path to the seller profiles CSV file")
     parser.add_argument("--output", type=str, default="poshmark_listings.db", help="Output SQLite database filename")
     parser.add_argument("--include-media", action="store_true", help="Include Image and ItemURL fields")
-    args = parser.parse_args()
+    parser.add_argument("--snapshot-store", type=str, default="", help="Also record the listings as a run in this snapshot store directory")
+    parser.add_argument("--metrics-file", type=str, default="", help="Write a metrics snapshot here (.json, or .prom for Prometheus textfile)")
+    parser.add_argument("--metrics-interval", type=float, default=30, help="Seconds between periodic metrics snapshots (0 to disable)")
+    parser.add_argument("--profile", type=str, default="", help="Write cProfile stats for the run to this file")
+    args = parser.parse_args(argv)
 
     profiles_csv = args.profiles if args.profiles else find_latest_profiles_csv()
-    create_database_from_folder(args.folder, profiles_csv=profiles_csv, db_path=args.output, include_media=args.include_media)
+    with metrics_run(args.metrics_file, args.metrics_interval, args.profile):
+        create_database_from_folder(args.folder, profiles_csv=profiles_csv, db_path=args.output, include_media=args.include_media, snapshot_store=args.snapshot_store)
 
 if __name__ == "__main__":
     main()